@@ -1,69 +1,156 @@
 import geopandas as gpd
 import pandas as pd
+import pyogrio
+import shapely
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Repo root, so the federal merge logic in src/utils.py can be reused
+repo_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_dir))
+
 # Step 1: Define the root directory containing your year folders
-root_dir = Path('E:/bdat2/project/fed/federal_electoral_districts_boundaries/') 
-# Step 2: List to hold individual GeoDataFrames
-gdfs = []
-
-# Step 3: Loop over each year folder
-for year_folder in root_dir.iterdir():
-    if year_folder.is_dir():
-        # Extract year from folder name (assume it's the folder name, e.g., '2000')
-        try:
-            election_year = int(year_folder.name)
-        except ValueError:
-            print(f"Skipping folder '{year_folder.name}' - not a valid year.")
-            continue
-        
-        # Find the .shp file in the folder
-        shp_file = list(year_folder.glob('*.shp'))
-        if not shp_file:
-            print(f"No .shp file found in '{year_folder.name}'.")
-            continue
-        shp_path = shp_file[0]  # Take the first (and only) .shp
-        
-        # Read the shapefile into a GeoDataFrame
-        gdf = gpd.read_file(shp_path)
-        
-        # Add the election_year column
-        #gdf['election_year'] = election_year
-        gdf['year'] = election_year
-        
-        # Reproject to a common CRS (choose one)
-        common_crs = 'EPSG:3347'  # Matches your Lambert_Conformal_Conic
-        # common_crs = 'EPSG:4326'  # Alternative: For web maps (uncomment if needed)
-        gdf = gdf.to_crs(common_crs)
-        print(f"Reprojected {election_year} to: {gdf.crs}")  # Confirm
-        
-        gdfs.append(gdf)
-        print(f"Loaded {len(gdf)} features for {election_year} from {shp_path.name}")
-
-# Step 4: Stack (concatenate) all GeoDataFrames into one
-if gdfs:
-    combined_gdf = pd.concat(gdfs, ignore_index=True)
-    
-    # Optional: Sort by year for consistency
-    combined_gdf = combined_gdf.sort_values('year').reset_index(drop=True)
-    
-    # Display basic info
-    print(f"\nCombined GeoDataFrame shape: {combined_gdf.shape}")
-    print(f"Columns: {list(combined_gdf.columns)}")
-    print(f"CRS: {combined_gdf.crs}")
-    print(f"Years covered: {sorted(combined_gdf['year'].unique())}")
-    
-    # Save the combined file (optional)
-    # combined_gdf.to_file('/path/to/combined_toronto_ridings.shp')
-    
-    # Now you can work with combined_gdf (e.g., plot, filter by year)
-    # Export to GeoPackage (recommended over .shp)
-    output_path = 'E:/bdat2/project/fed/federal_electoral_districts_boundaries/combined_toronto_ridings.gpkg'
-    combined_gdf.to_file(output_path, layer='toronto_ridings_all_years', driver='GPKG')
-
-    print(f"Exported to GeoPackage: {output_path}")
-    print(f"File size: {os.path.getsize(output_path) / (1024*1024):.2f} MB")  # Optional: Check size
-else:
-    print("No valid GeoDataFrames to combine.")
+root_dir = Path('E:/bdat2/project/fed/federal_electoral_districts_boundaries/')
+
+# Attribute fields worth keeping (whatever the source year calls them);
+# everything else is dropped at read time to save memory before concat
+keep_fields = [
+    'riding_num', 'feduid', 'fed_id', 'fednum', 'fed_num', 'ed_id', 'ed_num',
+    'riding_name', 'fedname', 'enname', 'fedename', 'ed_namee', 'ed_name_en',
+    'ed_name_e', 'ename', 'province', 'pruid', 'prname',
+]
+
+# Web simplification in metres (common_crs is metric); keep in sync with
+# RIDING_TOLERANCE_M / RIDING_WEB_LAYER in src/utils.py
+web_tolerance = 100
+web_layer = 'ridings_web'
+
+# Reproject to a common CRS (choose one)
+common_crs = 'EPSG:3347'  # Matches your Lambert_Conformal_Conic
+# common_crs = 'EPSG:4326'  # Alternative: For web maps (uncomment if needed)
+
+
+def load_year(year_folder):
+    """Read one year folder's shapefile; returns None if the folder is skipped."""
+    # Extract year from folder name (assume it's the folder name, e.g., '2000')
+    try:
+        election_year = int(year_folder.name)
+    except ValueError:
+        print(f"Skipping folder '{year_folder.name}' - not a valid year.")
+        return None
+
+    # Find the .shp file in the folder
+    shp_file = list(year_folder.glob('*.shp'))
+    if not shp_file:
+        print(f"No .shp file found in '{year_folder.name}'.")
+        return None
+    shp_path = shp_file[0]  # Take the first (and only) .shp
+
+    # Read the shapefile into a GeoDataFrame (pyogrio + Arrow is much faster than Fiona)
+    fields = pyogrio.read_info(shp_path)['fields']
+    columns = [f for f in fields if f.lower() in keep_fields]
+    gdf = gpd.read_file(shp_path, engine='pyogrio', use_arrow=True, columns=columns)
+
+    # Add the election_year column
+    #gdf['election_year'] = election_year
+    gdf['year'] = election_year
+
+    # Keep the source CRS for now; reprojection happens once after the loop
+    print(f"Loaded {len(gdf)} features for {election_year} from {shp_path.name}")
+    return gdf
+
+
+def export_federal_parquets(
+    gpkg_path,
+    csv_path=repo_dir / 'data' / 'federal_combined.csv',
+    out_dir=repo_dir / 'data',
+):
+    """Write one merged (boundaries + federal CSV) GeoParquet per election year."""
+    # Imported here so the worker processes don't pull in streamlit
+    from src.utils import load_gpkg, load_federal_csv, prepare_map_df
+
+    gdf_all = load_gpkg(str(gpkg_path), layer='toronto_ridings_all_years')
+    df_fed = load_federal_csv(str(csv_path))
+
+    for y in sorted(df_fed['year'].dropna().unique()):
+        # Full resolution: the page simplifies once, on load
+        merged = prepare_map_df(gdf_all, df_fed, int(y), simplify_tol=None)
+        out_path = Path(out_dir) / f'federal_{int(y)}.parquet'
+        merged.to_parquet(out_path)
+        print(f"Wrote {len(merged)} merged rows for {int(y)} to {out_path.name}")
+
+
+if __name__ == '__main__':
+    # Step 2: Read every year folder in parallel (processes, since GDAL holds
+    # the GIL for parts of the read)
+    year_dirs = [p for p in root_dir.iterdir() if p.is_dir()]
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        gdfs = [gdf for gdf in executor.map(load_year, year_dirs) if gdf is not None]
+
+    # Step 3: Stack (concatenate) all GeoDataFrames into one
+    if gdfs:
+        # Group the years by source CRS so each distinct CRS is reprojected in a
+        # single pass (one transformer) instead of once per year
+        by_crs = {}
+        for gdf in gdfs:
+            by_crs.setdefault(gdf.crs.to_wkt() if gdf.crs else None, []).append(gdf)
+
+        reprojected = []
+        for crs_gdfs in by_crs.values():
+            part = gpd.GeoDataFrame(pd.concat(crs_gdfs, ignore_index=True), crs=crs_gdfs[0].crs)
+            reprojected.append(part.to_crs(common_crs))
+            print(f"Reprojected {sorted(part['year'].unique())} to: {common_crs}")  # Confirm
+
+        combined_gdf = pd.concat(reprojected, ignore_index=True)
+
+        # Optional: Sort by year for consistency
+        combined_gdf = combined_gdf.sort_values('year').reset_index(drop=True)
+
+        # Display basic info
+        print(f"\nCombined GeoDataFrame shape: {combined_gdf.shape}")
+        print(f"Columns: {list(combined_gdf.columns)}")
+        print(f"CRS: {combined_gdf.crs}")
+        print(f"Years covered: {sorted(combined_gdf['year'].unique())}")
+
+        # Save the combined file (optional)
+        # combined_gdf.to_file('/path/to/combined_toronto_ridings.shp')
+
+        # Now you can work with combined_gdf (e.g., plot, filter by year)
+        # Export to GeoPackage (recommended over .shp)
+        output_path = 'E:/bdat2/project/fed/federal_electoral_districts_boundaries/combined_toronto_ridings.gpkg'
+        combined_gdf.to_file(
+            output_path,
+            layer='toronto_ridings_all_years',
+            driver='GPKG',
+            engine='pyogrio',
+            use_arrow=True,
+            SPATIAL_INDEX='YES',
+        )
+
+        # Extra pre-simplified layer for the map pages. Each year's ridings
+        # tile the city, so simplify them as one coverage; a per-polygon
+        # simplify opens gaps between neighbours
+        web_gdf = combined_gdf.copy()
+        for y, idx in web_gdf.groupby('year').groups.items():
+            web_gdf.loc[idx, 'geometry'] = shapely.coverage_simplify(
+                web_gdf.geometry.loc[idx].values, web_tolerance
+            )
+        web_gdf.to_file(
+            output_path,
+            layer=web_layer,
+            driver='GPKG',
+            engine='pyogrio',
+            use_arrow=True,
+            SPATIAL_INDEX='YES',
+        )
+        print(f"Wrote layer {web_layer} (tolerance {web_tolerance} m)")
+
+        print(f"Exported to GeoPackage: {output_path}")
+        print(f"File size: {os.path.getsize(output_path) / (1024*1024):.2f} MB")  # Optional: Check size
 
+        # Step 4: Per-year merged GeoParquet for the federal map page
+        export_federal_parquets(output_path)
+    else:
+        print("No valid GeoDataFrames to combine.")
@@ -1,18 +1,55 @@
+import os
+
+import geopandas as gpd
 import streamlit as st
 import folium
 import numpy as np
 from streamlit_folium import st_folium
-import branca.colormap as cm
 
-from src.utils import load_gpkg, load_federal_csv, prepare_map_df
+from src.utils import (
+    RIDING_TOLERANCE_M,
+    gpkg_web_layer,
+    load_gpkg,
+    load_federal_csv,
+    prepare_map_df,
+    simplify_for_web,
+)
 
 # Page Layout
 st.set_page_config(page_title="Federal Voter Participation Map", layout="wide")
 st.title("Toronto Federal Election - Voter Participation Map")
 
-# Load Data
-gdf_all = load_gpkg("data/combined_toronto_ridings.gpkg")
-df_fed = load_federal_csv("data/federal_combined.csv")
+GPKG_PATH = "data/combined_toronto_ridings.gpkg"
+CSV_PATH = "data/federal_combined.csv"
+PARQUET_PATH = "data/federal_{year}.parquet"  # optional, written by data/master_shape.py
+ZOOM_START = 10
+
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+# Merged map data per year; file mtimes are part of the key so edits
+# to the source data still invalidate the cache
+@st.cache_data(show_spinner=False)
+def _prep(year, gpkg_mtime, csv_mtime, parquet_mtime=None):
+    sources = [m for m in (gpkg_mtime, csv_mtime) if m is not None]
+    if parquet_mtime is not None and all(parquet_mtime >= m for m in sources):
+        # Precomputed merge for this year, newer than both sources
+        merged = gpd.read_parquet(PARQUET_PATH.format(year=year))
+    else:
+        # Use the pre-simplified layer when the GPKG has one
+        gdf_all = load_gpkg(GPKG_PATH, layer=gpkg_web_layer(GPKG_PATH), mtime=gpkg_mtime)
+        df_fed = load_federal_csv(CSV_PATH, mtime=csv_mtime)
+        # Geometry is simplified once below
+        merged = prepare_map_df(gdf_all, df_fed, year, simplify_tol=None)
+    # Ridings tile the city; a coverage simplify keeps neighbours edge-to-edge
+    return simplify_for_web(merged, RIDING_TOLERANCE_M, coverage=True)
+
+
+# Load Data (mtimes key the loader caches, so edited files are re-read)
+gpkg_mtime, csv_mtime = _mtime(GPKG_PATH), _mtime(CSV_PATH)
+df_fed = load_federal_csv(CSV_PATH, mtime=csv_mtime)
 
 years = sorted(df_fed["year"].dropna().unique())
 
@@ -24,7 +61,12 @@ year = st.selectbox("Select Election Year", years, index=len(years)-1)
 # ------------------------------------------------------
 # Prepare Federal Map Data
 # ------------------------------------------------------
-merged = prepare_map_df(gdf_all, df_fed, year)
+merged = _prep(
+    int(year),
+    gpkg_mtime,
+    csv_mtime,
+    _mtime(PARQUET_PATH.format(year=int(year))),
+)
 
 if merged is None or len(merged) == 0:
     st.error("No Toronto federal districts found for this election year.")
@@ -38,18 +80,17 @@ merged[value_col] = merged[value_col].astype(float)
 # ------------------------------------------------------
 # TOP METRICS — SAME STYLE AS PROVINCIAL
 # ------------------------------------------------------
-max_idx = merged[value_col].idxmax()
-min_idx = merged[value_col].idxmin()
-
-max_row = merged.loc[max_idx]
-min_row = merged.loc[min_idx]
+# Positional lookups on the raw arrays (NaN = riding without data)
+vals = merged[value_col].to_numpy()
+names = merged["riding_name"].to_numpy()
+i_hi, i_lo = int(np.nanargmax(vals)), int(np.nanargmin(vals))
 
-max_name = max_row["riding_name"]
-min_name = min_row["riding_name"]
+max_name = names[i_hi]
+min_name = names[i_lo]
 
-max_turnout = max_row[value_col] / 100
-min_turnout = min_row[value_col] / 100
-avg_turnout = merged[value_col].mean() / 100
+max_turnout = vals[i_hi] / 100
+min_turnout = vals[i_lo] / 100
+avg_turnout = np.nanmean(vals) / 100
 
 c3, c1, c2 = st.columns(3)
 
@@ -67,35 +108,28 @@ with c2:
     st.markdown(f"**{min_name}**")
     st.markdown(f"<h2 style='margin-top:-10px'>{min_turnout:.2%}</h2>", unsafe_allow_html=True)
 
-# ------------------------------------------------------
-# BLUE COLOR GRADIENT (same as provincial)
-# ------------------------------------------------------
-vmin = merged[value_col].min()
-vmax = merged[value_col].max()
-
-colormap = cm.LinearColormap(
-    ["#deebf7", "#9ecae1", "#3182bd"],
-    vmin=vmin,
-    vmax=vmax
-)
-colormap.caption = "Voter Participation (%)"
-
 # ------------------------------------------------------
 # Create Map
 # ------------------------------------------------------
-m = folium.Map(location=[43.7, -79.4], zoom_start=10)
-
-def style_function(feature):
-    val = feature["properties"].get(value_col)
-    if val is None or np.isnan(val):
-        return {"fillColor": "#cccccc", "color": "black", "weight": 0.5, "fillOpacity": 0.4}
-    
-    return {
-        "fillColor": colormap(val),
-        "color": "black",
-        "weight": 0.5,
-        "fillOpacity": 0.85,
-    }
+m = folium.Map(location=[43.7, -79.4], zoom_start=ZOOM_START)
+
+# Classed choropleth: folium bins the values and maps key -> colour once,
+# instead of a per-feature style_function. Keyed on geo_key because
+# boundaries without a CSV match have no riding_name.
+choropleth = folium.Choropleth(
+    geo_data=merged[["geo_key", "riding_name", value_col, "geometry"]],
+    data=merged[["geo_key", value_col]].dropna(),
+    columns=["geo_key", value_col],
+    key_on="feature.properties.geo_key",
+    fill_color="Blues",
+    bins=6,
+    fill_opacity=0.85,
+    nan_fill_color="#cccccc",
+    nan_fill_opacity=0.4,
+    line_color="black",
+    line_weight=0.5,
+    legend_name="Voter Participation (%)",
+).add_to(m)
 
 tooltip = folium.GeoJsonTooltip(
     fields=["riding_name", value_col],
@@ -104,19 +138,13 @@ tooltip = folium.GeoJsonTooltip(
     sticky=True,
     labels=True
 )
-
-folium.GeoJson(
-    merged,
-    style_function=style_function,
-    tooltip=tooltip
-).add_to(m)
-
-colormap.add_to(m)
+choropleth.geojson.add_child(tooltip)
 
 # ------------------------------------------------------
 # Render Map
 # ------------------------------------------------------
-st_folium(m, height=650, width=900)
+# No returned objects => pan/zoom/hover don't trigger a rerun of the page
+st_folium(m, height=650, width=900, returned_objects=[], key="federal_map")
 
 # ------------------------------------------------------
 # Underlying Data (hidden in an expander)
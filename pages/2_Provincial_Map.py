@@ -1,9 +1,35 @@
 import streamlit as st
 import folium
+import numpy as np
 from streamlit_folium import st_folium
 import branca.colormap as cm
+from src.utils import RIDING_TOLERANCE_M, colormap_hex, simplify_for_web
 from src.utils_pro import get_provincial_map
 
+ZOOM_START = 10
+
+
+@st.cache_data(show_spinner=False)
+def _provincial_map(year, tolerance=RIDING_TOLERANCE_M):
+    # Districts tile the city; a coverage simplify keeps neighbours edge-to-edge
+    return simplify_for_web(get_provincial_map(year), tolerance, coverage=True)
+
+
+# Colour scale only depends on the year's data, so build it once per year
+@st.cache_data(show_spinner=False)
+def _colormap_for_year(year):
+    vals = _provincial_map(year)["VoterTurnoutPercentageOfList"].astype(float)
+    vmin, vmax = float(vals.min()), float(vals.max())
+
+    colormap = cm.LinearColormap(
+        ["#deebf7", "#9ecae1", "#3182bd"],
+        vmin=vmin,
+        vmax=vmax
+    )
+    colormap.caption = "Voter Turnout (%)"
+    return vmin, vmax, colormap
+
+
 # ------------------------------
 # Page Title
 # ------------------------------
@@ -19,7 +45,7 @@ year = st.selectbox("Select Election Year", [2018, 2022], index=1)
 # ------------------------------
 # Load Toronto-Only Map Data
 # ------------------------------
-gdf = get_provincial_map(year)
+gdf = _provincial_map(year)
 
 if gdf is None or len(gdf) == 0:
     st.error("No Toronto provincial districts found for this election year.")
@@ -33,18 +59,16 @@ gdf[turnout_col] = gdf[turnout_col].astype(float)
 # ------------------------------
 # Data Cards: Highest, Lowest, Average Turnout
 # ------------------------------
-max_idx = gdf[turnout_col].astype(float).idxmax()
-min_idx = gdf[turnout_col].astype(float).idxmin()
+vals = gdf[turnout_col].to_numpy()
+names = gdf["ENGLISH_NA"].to_numpy()
+i_hi, i_lo = int(np.nanargmax(vals)), int(np.nanargmin(vals))
 
-max_row = gdf.loc[max_idx]
-min_row = gdf.loc[min_idx]
+max_name = names[i_hi]
+min_name = names[i_lo]
 
-max_name = max_row["ENGLISH_NA"]
-min_name = min_row["ENGLISH_NA"]
-
-max_turnout = max_row[turnout_col]
-min_turnout = min_row[turnout_col]
-avg_turnout = gdf[turnout_col].mean()
+max_turnout = vals[i_hi]
+min_turnout = vals[i_lo]
+avg_turnout = np.nanmean(vals)
 
 c3, c1, c2 = st.columns(3)
 
@@ -68,22 +92,17 @@ with c2:
 # ------------------------------
 # Create Toronto Map
 # ------------------------------
-m = folium.Map(location=[43.7, -79.4], zoom_start=10)
+m = folium.Map(location=[43.7, -79.4], zoom_start=ZOOM_START)
 
 
 # ------------------------------
 # Color Ramp (Blue Gradient)
 # ------------------------------
-colormap = cm.LinearColormap(
-    ["#deebf7", "#9ecae1", "#3182bd"],
-    vmin=min_turnout,
-    vmax=max_turnout
-)
-colormap.caption = "Voter Turnout (%)"
+vmin, vmax, colormap = _colormap_for_year(year)
 colormap.add_to(m)
 
 # assign color to each riding
-gdf["color"] = gdf[turnout_col].apply(colormap)
+gdf["color"] = colormap_hex(colormap, gdf[turnout_col].to_numpy())
 
 
 # ------------------------------
@@ -101,8 +120,9 @@ tooltip = folium.GeoJsonTooltip(
 # ------------------------------
 # Polygon Layer with Tooltip
 # ------------------------------
+# Only the fields the tooltip/style read go into the GeoJSON
 folium.GeoJson(
-    gdf,
+    gdf[["ENGLISH_NA", turnout_col, "color", "geometry"]],
     tooltip=tooltip,
     style_function=lambda feature: {
         "fillColor": feature["properties"]["color"],
@@ -116,4 +136,5 @@ folium.GeoJson(
 # ------------------------------
 # Render Map in Streamlit
 # ------------------------------
-st_folium(m, height=650, width=900)
+# No returned objects => pan/zoom/hover don't trigger a rerun of the page
+st_folium(m, height=650, width=900, returned_objects=[], key="provincial_map")
@@ -1,12 +1,12 @@
 # 3_Municipal_Map.py
 
 from __future__ import annotations
-import json
 import geopandas as gpd
-import pandas as pd
+import numpy as np
 import streamlit as st
 import pydeck as pdk
 
+from src.utils import simplify_for_web
 from src.utils_mun import (
     load_municipal_geometries,
     load_municipal_turnout,
@@ -26,14 +26,66 @@ st.set_page_config(
 # ------------------------------------------------------
 # Cache Loaders
 # ------------------------------------------------------
-@st.cache_data
+# Base frames are shared by reference (no pickle/hash per access);
+# callers must treat them as read-only
+@st.cache_resource
 def get_turnout_df():
     return load_municipal_turnout()
 
-@st.cache_data
+@st.cache_resource
 def get_geom_gdf():
     return load_municipal_geometries()
 
+ZOOM = 9.7
+# Subdivisions are only a few hundred metres across, so the riding
+# tolerance (100 m) distorts them badly; keep simplification fine here
+MUN_TOLERANCE_M = 5.0
+
+@st.cache_data
+def get_year_gdf(year, tolerance=MUN_TOLERANCE_M):
+    gdf_year = simplify_for_web(
+        prepare_municipal_year_gdf(year, get_geom_gdf(), get_turnout_df()), tolerance
+    )
+    # Ward repeats across thousands of subdivisions
+    gdf_year["Ward"] = gdf_year["Ward"].astype("category")
+    return gdf_year
+
+@st.cache_data
+def get_ward_gdf(year, tolerance=MUN_TOLERANCE_M):
+    # Dissolved wards tile the city, so simplify them as a coverage to keep
+    # neighbouring wards on the same shared edges
+    gdf_year = prepare_municipal_year_gdf(year, get_geom_gdf(), get_turnout_df())
+    gdf_ward = gdf_year.dissolve(
+        by="Ward",
+        aggfunc={"Year": "first", "PctVoted": "mean"},
+        as_index=False,
+    )
+    return simplify_for_web(gdf_ward, tolerance, coverage=True)
+
+
+# ------------------------------------------------------
+# TRUE PROVINCIAL BLUE GRADIENT (EXACT MATCH)
+# ------------------------------------------------------
+def turnout_to_color(pct: np.ndarray) -> np.ndarray:
+    """Map PctVoted (0–1) to an (N, 3) uint8 RGB array; NaN => grey."""
+    p = np.asarray(pct, dtype=float)
+
+    ratio = np.clip(p, 0, 1)[:, None]
+
+    # Provincial gradient:
+    # light => medium => dark
+    light = np.array([222, 235, 247], dtype=float)   # #deebf7
+    mid   = np.array([158, 202, 225], dtype=float)   # #9ecae1
+    dark  = np.array([49, 130, 189], dtype=float)    # #3182bd
+
+    # Two-step interpolation
+    low = light + (mid - light) * (ratio / 0.5)
+    high = mid + (dark - mid) * ((ratio - 0.5) / 0.5)
+    rgb = np.where(ratio < 0.5, low, high)
+
+    rgb[np.isnan(p)] = 210  # grey
+    return rgb.astype(np.uint8)
+
 
 # ------------------------------------------------------
 # Main Page
@@ -43,7 +95,6 @@ def main():
     st.title("Toronto Municipal Election — Voter Turnout Map")
 
     turnout_df = get_turnout_df()
-    geom_gdf = get_geom_gdf()
 
     # ------------------------------
     # Year Selector (TOP)
@@ -51,8 +102,13 @@ def main():
     years = get_available_years(turnout_df)
     year = st.selectbox("Select Election Year", years, index=len(years)-1)
 
+    # Ward view dissolves subdivisions into one polygon per ward (mean turnout)
+    view = st.radio("View", ["Subdivision", "Ward"], horizontal=True)
+    by_sub = view == "Subdivision"
+    keys = ["Ward", "Sub"] if by_sub else ["Ward"]
+
     # Load year-specific geometry + turnout
-    gdf_year = prepare_municipal_year_gdf(year, geom_gdf, turnout_df)
+    gdf_year = get_year_gdf(year) if by_sub else get_ward_gdf(year)
 
     # Summary stats (PctVoted is 0–1 => convert to 0–100)
     summary = compute_turnout_summary(gdf_year)
@@ -61,16 +117,21 @@ def main():
     min_turnout = summary["min"] * 100 if summary["min"] is not None else None
     max_turnout = summary["max"] * 100 if summary["max"] is not None else None
 
-    # Determine highest / lowest turnout subdivisions
-    if len(gdf_year) > 0:
-        max_row = gdf_year.loc[gdf_year["PctVoted"].idxmax()]
-        min_row = gdf_year.loc[gdf_year["PctVoted"].idxmin()]
-
-        highest_label = f"Ward {max_row['Ward']} – Sub {max_row['Sub']}"
-        lowest_label = f"Ward {min_row['Ward']} – Sub {min_row['Sub']}"
-
-        highest_val = max_row["PctVoted"] * 100
-        lowest_val = min_row["PctVoted"] * 100
+    # Determine highest / lowest turnout subdivisions (or wards)
+    pct = gdf_year["PctVoted"].to_numpy(dtype=float)
+    if (~np.isnan(pct)).any():
+        i_hi, i_lo = int(np.nanargmax(pct)), int(np.nanargmin(pct))
+        wards = gdf_year["Ward"].to_numpy()
+
+        highest_label = f"Ward {wards[i_hi]}"
+        lowest_label = f"Ward {wards[i_lo]}"
+        if by_sub:
+            subs = gdf_year["Sub"].to_numpy()
+            highest_label += f" – Sub {subs[i_hi]}"
+            lowest_label += f" – Sub {subs[i_lo]}"
+
+        highest_val = pct[i_hi] * 100
+        lowest_val = pct[i_lo] * 100
     else:
         highest_label = lowest_label = "N/A"
         highest_val = lowest_val = None
@@ -107,45 +168,15 @@ def main():
         )
 
     with c4:
-        st.markdown("### Total Subdivisions")
+        st.markdown("### Total Subdivisions" if by_sub else "### Total Wards")
         st.markdown(f"<h2 style='margin-top:-10px'>{summary['n']}</h2>", unsafe_allow_html=True)
 
-    # ------------------------------------------------------
-    # TRUE PROVINCIAL BLUE GRADIENT (EXACT MATCH)
-    # ------------------------------------------------------
-    def turnout_to_color(p):
-        if p is None or pd.isna(p):
-            return [210, 210, 210]  # grey
-
-        # Convert 0–1 → 0–100
-        p = p * 100
-        ratio = max(0, min(p / 100, 1))
-
-        # Provincial gradient:
-        # light => medium => dark
-        light = (222, 235, 247)   # #deebf7
-        mid   = (158, 202, 225)   # #9ecae1
-        dark  = (49, 130, 189)    # #3182bd
-
-        # Two-step interpolation
-        if ratio < 0.5:
-            t = ratio / 0.5
-            r = int(light[0] + (mid[0] - light[0]) * t)
-            g = int(light[1] + (mid[1] - light[1]) * t)
-            b = int(light[2] + (mid[2] - light[2]) * t)
-        else:
-            t = (ratio - 0.5) / 0.5
-            r = int(mid[0] + (dark[0] - mid[0]) * t)
-            g = int(mid[1] + (dark[1] - mid[1]) * t)
-            b = int(mid[2] + (dark[2] - mid[2]) * t)
-
-        return [r, g, b]
-
-    # Build GeoJSON with consistent colors
-    gjson = json.loads(gdf_year.to_json())
-    for f in gjson["features"]:
-        p = f["properties"].get("PctVoted", None)
-        f["properties"]["color"] = turnout_to_color(p)
+    # Build GeoJSON with consistent colors (dict straight from the frame,
+    # no to_json() string round-trip; only the fields the tooltip reads)
+    gjson = gdf_year[[*keys, "PctVoted", "geometry"]].to_geo_dict()
+    colors = turnout_to_color(gdf_year["PctVoted"].to_numpy()).tolist()
+    for f, c in zip(gjson["features"], colors):
+        f["properties"]["color"] = c
 
     # ------------------------------
     # PyDeck Layer
@@ -165,15 +196,15 @@ def main():
     view_state = pdk.ViewState(
         latitude=43.70,
         longitude=-79.38,
-        zoom=9.7,
+        zoom=ZOOM,
         pitch=0,
     )
 
     tooltip = {
         "html":
             "<b>Ward:</b> {Ward}<br/>"
-            "<b>Subdivision:</b> {Sub}<br/>"
-            "<b>% Voted:</b> {PctVoted}",
+            + ("<b>Subdivision:</b> {Sub}<br/>" if by_sub else "")
+            + "<b>% Voted:</b> {PctVoted}",
         "style": {
             "backgroundColor": "rgba(0, 0, 60, 0.7)",
             "color": "white",
@@ -194,12 +225,13 @@ def main():
     # Data Table (converted to %)
     # ------------------------------
     with st.expander("Show Data Table"):
-        df_display = gdf_year.copy()
-        df_display["PctVoted"] = df_display["PctVoted"] * 100
+        # Only the table columns; no need to copy the geometry
+        df_display = gdf_year[["Year", *keys, "PctVoted"]].assign(
+            PctVoted=gdf_year["PctVoted"] * 100
+        )
 
         st.dataframe(
-            df_display[["Year", "Ward", "Sub", "PctVoted"]]
-            .sort_values(["Ward", "Sub"]),
+            df_display.sort_values(keys),
             use_container_width=True
         )
 
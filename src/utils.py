@@ -1,10 +1,35 @@
+import os
 import re
+import uuid
+import warnings
 from pathlib import Path
 
 import pandas as pd
 import geopandas as gpd
 import numpy as np
+import pyarrow as pa
+import pyogrio
+import shapely
 import streamlit as st
+from pyarrow import csv as pacsv
+from rapidfuzz import fuzz, process
+from shapely.geometry import box
+
+# Riding boundaries are drawn at one fixed simplification (metres, EPSG:3347):
+# the pages open at a fixed city zoom and st_folium hands back no map state,
+# so there is no live zoom to pick a finer tier from.
+# data/master_shape.py writes a matching pre-simplified GPKG layer.
+RIDING_TOLERANCE_M = 100.0
+RIDING_WEB_LAYER = "ridings_web"
+
+# (minx, miny, maxx, maxy) in EPSG:4326, padded slightly around the city
+TORONTO_BBOX = (-79.65, 43.57, -79.10, 43.87)
+
+# Compiled once; used for ID cleanup, name normalization and turnout parsing
+_TRAILING_ZEROS = re.compile(r"\.0+$")
+_WS = re.compile(r"\s+")
+_NUMBER = re.compile(r"([0-9]+(?:\.[0-9]+)?)")
+_WORD = re.compile(r"\w+")
 
 # ----------------------------------------------------
 # Helpers
@@ -15,20 +40,33 @@ def normalize_names(series: pd.Series) -> pd.Series:
         series.fillna("")
         .astype(str)
         .str.strip()
-        .str.replace(r"\s+", " ", regex=True)
+        .str.replace(_WS, " ", regex=True)
         .str.lower()
     )
 
 
 def find_col_by_keywords(cols, keywords):
     """Return the first column name containing any of the keywords."""
-    if cols is None:
+    if cols is None or not keywords:
         return None
 
+    # One case-insensitive alternation instead of a cols x keywords loop
+    pat = re.compile("|".join(re.escape(kw) for kw in keywords), re.IGNORECASE)
     for c in cols:
-        low = str(c).strip().lower()
-        for kw in keywords:
-            if kw.lower() in low:
+        if pat.search(str(c)):
+            return c
+
+    # Near misses such as "Voters Turnout (%)" for "voter turnout": every word
+    # of the keyword must closely match some word of the header. Whole-string
+    # scores can't tell "district number" from "district name".
+    col_words = [_WORD.findall(str(c).lower()) for c in cols]
+    for kw in keywords:
+        kw_words = _WORD.findall(kw.lower())
+        for c, words in zip(cols, col_words):
+            if words and all(
+                process.extractOne(w, words, scorer=fuzz.ratio, score_cutoff=85)
+                for w in kw_words
+            ):
                 return c
     return None
 
@@ -53,37 +91,191 @@ def detect_join_key(gdf: gpd.GeoDataFrame, df: pd.DataFrame):
     return None
 
 
-def _safe_str_intlike(x):
-    """Convert ID-like values safely to string without trailing .0."""
-    if pd.isna(x):
-        return ""
+def _geo_key(df):
+    """Vectorized "<year>__<riding_num>" key; missing parts become ""."""
+    if "year" in df.columns:
+        year_s = (
+            pd.to_numeric(df["year"], errors="coerce")
+            .astype("Int64").astype(str).replace({"<NA>": ""})
+        )
+    else:
+        year_s = pd.Series("", index=df.index)
 
-    if isinstance(x, (int, np.integer)):
-        return str(int(x))
+    if "riding_num" in df.columns:
+        rnum_s = (
+            df["riding_num"].fillna("").astype(str)
+            .str.strip().str.replace(_TRAILING_ZEROS, "", regex=True)
+        )
+    else:
+        rnum_s = pd.Series("", index=df.index)
 
-    try:
-        s = str(x).strip()
-        s = re.sub(r"\.0+$", "", s)
-        return s
-    except Exception:
-        return str(x)
+    return year_s.str.cat(rnum_s, sep="__")
+
+
+def _geo_key_i(df):
+    """Integer twin of geo_key: year * 100000 + riding_num (5-digit); NA if non-numeric."""
+    if "year" not in df.columns or "riding_num" not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype="Int64")
+
+    year_n = pd.to_numeric(df["year"], errors="coerce")
+    rnum_n = pd.to_numeric(df["riding_num"], errors="coerce")
+    # Out-of-range ids would collide with another year's keys; leave them NA
+    # so the string geo_key is used instead
+    key = year_n * 100000 + rnum_n.where((rnum_n % 1 == 0) & rnum_n.between(0, 99999))
+    return key.astype("Int64")
 
-# ----------------------------------------------------
-# Loaders (CLEANED)
-# ----------------------------------------------------
-@st.cache_data(ttl=3600)
-def load_gpkg(path: str = "data/combined_toronto_ridings.gpkg"):
-    """Load combined GPKG of ridings with defensive normalization."""
-    gdf = gpd.read_file(path)
 
-    # Ensure CRS
+def _add_prev_participation(df: pd.DataFrame) -> pd.DataFrame:
+    """Add prev_participation: the riding's turnout at the previous election."""
+    key = "riding_id" if "riding_id" in df.columns else "riding_name"
+    if key not in df.columns or "year" not in df.columns:
+        return df
+
+    df = df.copy()
+    # Index-aligned assignment keeps the original row order
+    df["prev_participation"] = (
+        df.sort_values([key, "year"])
+        .groupby(key)["voter_participation_pct"]
+        .shift(1)
+    )
+    return df
+
+
+def _read_csv_str(path, encoding="utf8") -> pd.DataFrame:
+    """Read a CSV with pyarrow's multi-threaded reader, every column as string."""
+    read_opts = pacsv.ReadOptions(encoding=encoding)
+    names = pacsv.open_csv(path, read_options=read_opts).schema.names
+    convert_opts = pacsv.ConvertOptions(
+        column_types={n: pa.string() for n in names},
+        strings_can_be_null=True,
+    )
+    return pacsv.read_csv(
+        path, read_options=read_opts, convert_options=convert_opts
+    ).to_pandas()
+
+
+def simplify_for_web(
+    gdf: gpd.GeoDataFrame, tolerance: float = 20.0, coverage: bool = False
+) -> gpd.GeoDataFrame:
+    """Simplify polygons in EPSG:3347 (tolerance in metres), return in EPSG:4326.
+
+    With ``coverage=True`` the polygons are simplified as one coverage, so
+    shared edges are simplified once and neighbours stay gap/overlap free.
+    """
+    if gdf is None or gdf.empty:
+        return gdf
+
     if gdf.crs is None:
         gdf = gdf.set_crs(epsg=4326)
+
+    out = gdf.to_crs(epsg=3347)
+    if coverage:
+        out["geometry"] = shapely.coverage_simplify(out.geometry.values, tolerance)
     else:
+        out["geometry"] = out.geometry.simplify(tolerance=tolerance, preserve_topology=True)
+    return out.to_crs(epsg=4326)
+
+
+def colormap_hex(colormap, values, nan_color=None) -> list:
+    """Vectorized `colormap(v)` for a branca LinearColormap (same hex output)."""
+    vals = np.asarray(values, dtype=float)
+    index = np.asarray(colormap.index, dtype=float)
+    colors = np.asarray(colormap.colors, dtype=float)
+
+    rgba = np.column_stack([np.interp(vals, index, colors[:, j]) for j in range(4)])
+    rgba = (np.nan_to_num(rgba) * 255.9999).astype(int)
+
+    return [
+        nan_color if np.isnan(v) else "#%02x%02x%02x%02x" % tuple(c)
+        for v, c in zip(vals, rgba)
+    ]
+
+
+def gpkg_web_layer(path: str):
+    """Return RIDING_WEB_LAYER if the GPKG has the pre-simplified layer."""
+    try:
+        layers = pyogrio.list_layers(path)[:, 0]
+    except Exception:
+        return None
+    return RIDING_WEB_LAYER if RIDING_WEB_LAYER in layers else None
+
+def read_layer_4326(path, layer=None, bbox=None) -> gpd.GeoDataFrame:
+    """Read a GPKG layer (or a GeoParquet file) in EPSG:4326.
+
+    Layers stored in another CRS are reprojected once and materialized next
+    to the source as `<name>.<layer>.4326.gpkg`; later reads load that copy.
+    `bbox` is a GeoSeries or a (minx, miny, maxx, maxy) tuple in EPSG:4326.
+    """
+    src = Path(path)
+    if bbox is not None and not isinstance(bbox, gpd.GeoSeries):
+        # One type for both branches; read_file reprojects a GeoSeries
+        # to the file's CRS, while a bare tuple would be taken as-is
+        bbox = gpd.GeoSeries([box(*bbox)], crs="EPSG:4326")
+    if src.suffix == ".parquet":
+        # GeoParquet has no layers; bbox is applied after the read
+        gdf = gpd.read_parquet(src)
+        gdf = gdf.set_crs(epsg=4326) if gdf.crs is None else gdf.to_crs(epsg=4326)
+        if bbox is not None:
+            gdf = gdf[gdf.intersects(bbox.to_crs(epsg=4326).union_all())]
+        return gdf
+
+    if layer is None:
+        layer = pyogrio.list_layers(src)[0][0]
+
+    def _read(p, **kw):
+        return gpd.read_file(p, layer=layer, engine="pyogrio", use_arrow=True, **kw)
+
+    crs = pyogrio.read_info(src, layer=layer)["crs"]
+    if crs is None or crs.upper() == "EPSG:4326":
+        gdf = _read(src, bbox=bbox)
+        return gdf if gdf.crs is not None else gdf.set_crs(epsg=4326)
+
+    pre = src.with_name(f"{src.stem}.{layer}.4326.gpkg")
+    try:
+        fresh = (
+            pre.stat().st_mtime >= src.stat().st_mtime
+            and layer in pyogrio.list_layers(pre)[:, 0]
+        )
+    except Exception:
+        fresh = False  # missing, or a truncated/corrupt copy
+
+    if not fresh:
+        # Whole layer, so later reads with any bbox stay correct. Each load
+        # writes its own temp file and renames it into place, so concurrent
+        # cold loads never see (or leave behind) a half-written copy.
+        tmp = pre.with_name(f"{src.stem}.{layer}.{uuid.uuid4().hex}.4326.gpkg")
         try:
-            gdf = gdf.to_crs(epsg=4326)
+            _read(src).to_crs(epsg=4326).to_file(
+                tmp, layer=layer, driver="GPKG", engine="pyogrio", SPATIAL_INDEX="YES"
+            )
+            os.replace(tmp, pre)
         except Exception:
-            print("Warning: CRS conversion failed; using original CRS.")
+            tmp.unlink(missing_ok=True)
+            warnings.warn(f"Could not write {pre.name}; reprojecting on this load.")
+            gdf = _read(src, bbox=bbox)
+            try:
+                return gdf.to_crs(epsg=4326)
+            except Exception:
+                warnings.warn("CRS conversion failed; using original CRS.")
+                return gdf
+
+    return _read(pre, bbox=bbox)
+
+
+# ----------------------------------------------------
+# Loaders (CLEANED)
+# ----------------------------------------------------
+@st.cache_resource(ttl=3600)
+def load_gpkg(path: str = "data/combined_toronto_ridings.gpkg", layer=None, mtime=None):
+    """Load combined GPKG (or GeoParquet) of ridings with defensive normalization.
+
+    `mtime` is only part of the cache key: pass the file's mtime so an
+    edited file is reloaded instead of served from the cache.
+    """
+    # Only ridings touching Toronto; the GPKG's RTree index skips the rest.
+    # Passed as a GeoSeries so it is reprojected to the file's CRS.
+    bbox = gpd.GeoSeries([box(*TORONTO_BBOX)], crs="EPSG:4326")
+    gdf = read_layer_4326(path, layer=layer, bbox=bbox)
 
     # Normalize columns
     gdf.columns = gdf.columns.str.strip().str.lower()
@@ -102,7 +294,7 @@ def load_gpkg(path: str = "data/combined_toronto_ridings.gpkg"):
 
         if id_col:
             gdf["riding_num"] = (
-                gdf[id_col].astype(str).str.strip().str.replace(r"\.0+$", "", regex=True)
+                gdf[id_col].astype(str).str.strip().str.replace(_TRAILING_ZEROS, "", regex=True)
             )
         else:
             gdf["riding_num"] = None
@@ -120,30 +312,25 @@ def load_gpkg(path: str = "data/combined_toronto_ridings.gpkg"):
     if "year" in gdf.columns:
         gdf["year"] = pd.to_numeric(gdf["year"], errors="coerce").astype("Int64")
 
-    # Composite geo_key
-    def _safe_str(x):
-        if pd.isna(x):
-            return ""
-        try:
-            return str(int(x))
-        except Exception:
-            return re.sub(r"\.0+$", "", str(x)).strip()
-
-    gdf["geo_key"] = gdf.apply(
-        lambda r: f"{_safe_str(r.get('year', ''))}__{str(r.get('riding_num', '')).strip()}",
-        axis=1,
-    )
+    # Composite geo_key (string) and its integer form for faster merges
+    gdf["geo_key"] = _geo_key(gdf)
+    gdf["geo_key_i"] = _geo_key_i(gdf)
 
     return gdf
 
 
-@st.cache_data(ttl=3600)
-def load_federal_csv(path: str = "data/federal_combined.csv"):
-    """Load and normalize federal CSV with fuzzy header matching."""
+@st.cache_resource(ttl=3600)
+def load_federal_csv(path: str = "data/federal_combined.csv", mtime=None):
+    """Load and normalize federal CSV with fuzzy header matching.
+
+    `mtime` is only part of the cache key (see load_gpkg).
+    """
     try:
-        df = pd.read_csv(path, dtype=str)
-    except UnicodeDecodeError:
-        df = pd.read_csv(path, dtype=str, encoding="latin1")
+        df = _read_csv_str(path)
+    except (pa.ArrowInvalid, UnicodeDecodeError):
+        # Bad UTF-8 in the body surfaces as ArrowInvalid, in the header
+        # (decoded while reading the schema) as UnicodeDecodeError
+        df = _read_csv_str(path, encoding="latin1")
 
     raw_cols = list(df.columns)
     col_map = {}
@@ -192,12 +379,12 @@ def load_federal_csv(path: str = "data/federal_combined.csv"):
     # Clean riding_num
     if "riding_num" in df.columns:
         df["riding_num"] = (
-            df["riding_num"].astype(str).str.strip().str.replace(r"\.0+$", "", regex=True)
+            df["riding_num"].astype(str).str.strip().str.replace(_TRAILING_ZEROS, "", regex=True)
         )
     else:
         # emergency fallback
         if "riding_name" in df.columns:
-            df["riding_num"] = normalize_names(df["riding_name"]).str.replace(r"\s+", "_", regex=True)
+            df["riding_num"] = normalize_names(df["riding_name"]).str.replace(_WS, "_", regex=True)
         else:
             print("Warning: No riding_num or riding_name found in CSV; joins may fail.")
 
@@ -207,29 +394,105 @@ def load_federal_csv(path: str = "data/federal_combined.csv"):
 
     # Clean voter participation numeric
     if "voter_participation_pct" in df.columns:
-        df["voter_participation_pct"] = (
+        pct_s = (
             df["voter_participation_pct"]
             .astype(str)
-            .str.replace("%", "")
-            .str.replace(",", ".")
-            .str.extract(r"([0-9]+(?:\.[0-9]+)?)")[0]
-        )
-        df["voter_participation_pct"] = pd.to_numeric(
-            df["voter_participation_pct"], errors="coerce"
+            .str.replace("%", "", regex=False)
+            .str.replace(",", ".", regex=False)
         )
+        # Plain numbers convert directly; only leftovers get the regex scan
+        pct = pd.to_numeric(pct_s, errors="coerce")
+        retry = pct.isna() & pct_s.notna()
+        if retry.any():
+            pct.loc[retry] = pd.to_numeric(
+                pct_s[retry].str.extract(_NUMBER)[0], errors="coerce"
+            )
+        df["voter_participation_pct"] = pct
 
     # Composite geo_key
     df["riding_num"] = df["riding_num"].replace({"nan": None, "None": None, "none": None})
-    df["geo_key"] = df.apply(
-        lambda r: f"{_safe_str_intlike(r.get('year', ''))}__{str(r.get('riding_num', '')).strip()}",
-        axis=1,
-    )
+    df["geo_key"] = _geo_key(df)
+    df["geo_key_i"] = _geo_key_i(df)
+
+    # Previous election's turnout per riding, computed once here
+    if "voter_participation_pct" in df.columns:
+        df = _add_prev_participation(df)
+
+    # Few distinct values per column: categoricals are smaller and merge on codes
+    for col in ("riding_name", "province"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
 
     return df
 
 # ----------------------------------------------------
 # Data preparation (CLEAN)
 # ----------------------------------------------------
+def _gdf_fingerprint(gdf: gpd.GeoDataFrame) -> bytes:
+    """Content hash for st.cache_data, which can't hash GeoDataFrames itself."""
+    attrs = pd.util.hash_pandas_object(pd.DataFrame(gdf.drop(columns=gdf.geometry.name)))
+    return attrs.to_numpy().tobytes() + b"".join(gdf.geometry.to_wkb())
+
+
+@st.cache_data(ttl=3600, show_spinner=False, hash_funcs={gpd.GeoDataFrame: _gdf_fingerprint})
+def _simplified_year_gdf(gdf_all: gpd.GeoDataFrame, year: int, tol: float) -> gpd.GeoDataFrame:
+    """One year of boundaries keyed by geo_key: duplicates dissolved, geometry simplified."""
+    view_gdf = gdf_all[gdf_all["year"] == int(year)]
+    view_gdf = view_gdf[view_gdf["geo_key"].astype(str).str.len() > 0].copy()
+    if view_gdf.empty:
+        return view_gdf
+
+    # dissolve duplicates
+    if view_gdf["geo_key"].duplicated(keep=False).any():
+        try:
+            cols = [c for c in ("geo_key", "geo_key_i", "geometry", "year") if c in view_gdf.columns]
+            tmp = view_gdf[cols]
+            view_gdf = (
+                gpd.GeoDataFrame(tmp, geometry="geometry", crs=view_gdf.crs)
+                .dissolve(by="geo_key", as_index=False)
+            )
+        except Exception:
+            # Whole-frame dissolve, first row's attributes per key. Parts of one
+            # riding tile without overlap, so shapely.coverage_union_all can be used.
+            view_gdf = view_gdf.dissolve(
+                by="geo_key", aggfunc="first", as_index=False, method="coverage"
+            )
+
+    # simplify (skipped when the caller simplifies afterwards)
+    if tol:
+        try:
+            view_gdf["geometry"] = view_gdf["geometry"].simplify(
+                tolerance=tol, preserve_topology=True
+            )
+        except Exception:
+            pass
+
+    return view_gdf
+
+
+# Keyed on the frame's identity: load_federal_csv hands out one shared frame,
+# and the cached value holds a reference to it, so the id can't be reused
+# while the entry lives. Callers must not mutate df_fed in place.
+@st.cache_resource(ttl=3600, show_spinner=False, hash_funcs={pd.DataFrame: id})
+def _indexed_fed(df_fed: pd.DataFrame):
+    """df_fed indexed on each geo key, plus the years whose keys are all numeric.
+
+    Returns (df_fed, {key: frame indexed on key, other key dropped}, int_years).
+    """
+    keys = [c for c in ("geo_key", "geo_key_i") if c in df_fed.columns]
+    indexed = {
+        key: df_fed.drop(columns=[c for c in keys if c != key]).set_index(key)
+        for key in keys
+    }
+
+    int_years = frozenset()
+    if "geo_key_i" in df_fed.columns and "year" in df_fed.columns:
+        ok = df_fed["geo_key_i"].notna().groupby(df_fed["year"]).all()
+        int_years = frozenset(int(y) for y in ok.index[ok])
+
+    return df_fed, indexed, int_years
+
+
 def prepare_map_df(
     gdf_all: gpd.GeoDataFrame,
     df_fed: pd.DataFrame,
@@ -237,7 +500,11 @@ def prepare_map_df(
     join_key_hint=None,
     simplify_tol=0.00008,
 ):
-    """Prepare a clean GeoDataFrame for mapping."""
+    """Prepare a clean GeoDataFrame for mapping.
+
+    Pass ``simplify_tol=None`` to keep full-resolution geometry, e.g. when
+    the result goes through ``simplify_for_web`` afterwards.
+    """
     # Normalize year naming
     if "election_year" in gdf_all.columns and "year" not in gdf_all.columns:
         gdf_all = gdf_all.rename(columns={"election_year": "year"})
@@ -245,50 +512,44 @@ def prepare_map_df(
     if "year" not in gdf_all.columns:
         raise ValueError("GPKG missing 'year' column.")
 
-    # Filter by year
-    view_gdf = gdf_all[gdf_all["year"] == int(year)].copy()
-    if view_gdf.empty:
-        return view_gdf
-
     # --------------------------------------------
-    # Preferred join: geo_key
+    # Preferred join: geo_key (year slice comes from the cached helper)
     # --------------------------------------------
-    if "geo_key" in view_gdf.columns and "geo_key" in df_fed.columns:
-        view_gdf = view_gdf[view_gdf["geo_key"].astype(str).str.len() > 0].copy()
-
-        if not view_gdf.empty:
-            df_year = df_fed[df_fed["year"] == int(year)].copy()
-
-            # dissolve duplicates
-            if view_gdf["geo_key"].duplicated(keep=False).any():
-                try:
-                    tmp = view_gdf[["geo_key", "geometry", "year"]].copy()
-                    view_gdf = (
-                        gpd.GeoDataFrame(tmp, geometry="geometry", crs=view_gdf.crs)
-                        .dissolve(by="geo_key", as_index=False)
-                    )
-                except Exception:
-                    grouped = []
-                    for key_val, grp in view_gdf.groupby("geo_key"):
-                        geom = grp.unary_union
-                        row = grp.iloc[0].to_dict()
-                        row["geometry"] = geom
-                        row["geo_key"] = key_val
-                        grouped.append(row)
-                    view_gdf = gpd.GeoDataFrame(grouped, crs=gdf_all.crs)
-
-            merged = view_gdf.merge(df_year, on="geo_key", how="left")
-
-            # simplify
-            try:
-                merged["geometry"] = merged["geometry"].simplify(
-                    tolerance=simplify_tol, preserve_topology=True
-                )
-            except Exception:
-                pass
+    if "geo_key" in gdf_all.columns and "geo_key" in df_fed.columns:
+        geo_gdf = _simplified_year_gdf(gdf_all, int(year), simplify_tol)
+
+        if not geo_gdf.empty:
+            # Both keys embed the year, so the prebuilt indexes over all years
+            # replace filtering df_fed and hashing it again on every call
+            _, fed_indexed, int_years = _indexed_fed(df_fed)
+
+            # Integer hash join when every key of this year is numeric on both
+            # sides (other years' keys can't match, so they don't matter)
+            key = "geo_key"
+            if (
+                "geo_key_i" in geo_gdf.columns and int(year) in int_years
+                and geo_gdf["geo_key_i"].notna().all()
+            ):
+                key = "geo_key_i"
+            fed_idx = fed_indexed[key]
+
+            # CSV attributes win; keeps riding_name etc. free of _x/_y suffixes.
+            # Both key columns stay on the boundary side so unmatched rows keep them.
+            keys = ("geo_key", "geo_key_i")
+            overlap = [c for c in geo_gdf.columns if c in fed_idx.columns and c not in keys]
+            merged = (
+                geo_gdf.drop(columns=overlap)
+                .join(fed_idx, on=key, how="left")
+                .reset_index(drop=True)
+            )
 
             return merged
 
+    # Filter by year
+    view_gdf = gdf_all[gdf_all["year"] == int(year)].copy()
+    if view_gdf.empty:
+        return view_gdf
+
     # --------------------------------------------
     # Fallback join: riding_id / riding_num / riding_name
     # --------------------------------------------
@@ -319,20 +580,20 @@ def prepare_map_df(
 
     join_key = detected_join
 
-    # Normalize join keys
+    # df_fed may be the shared cached object; don't normalize it in place
+    df_fed = df_fed.copy()
+
+    # Normalize join keys (key_s is reused for the missing mask below)
     if "name" in join_key.lower():
-        view_gdf[join_key] = normalize_names(view_gdf[join_key].astype(str))
+        key_s = normalize_names(view_gdf[join_key].astype(str))
         df_fed[join_key] = normalize_names(df_fed[join_key].astype(str))
     else:
-        view_gdf[join_key] = view_gdf[join_key].astype(str).str.strip()
+        key_s = view_gdf[join_key].astype(str).str.strip()
         df_fed[join_key] = df_fed[join_key].astype(str).str.strip()
+    view_gdf[join_key] = key_s
 
-    # Drop missing join keys
-    missing_mask = (
-        view_gdf[join_key].isna()
-        | (view_gdf[join_key].astype(str).str.len() == 0)
-        | (view_gdf[join_key].astype(str).str.lower() == "none")
-    )
+    # Drop missing join keys ("nan"/"none" are what astype(str) makes of NA)
+    missing_mask = key_s.isna() | key_s.eq("") | key_s.str.lower().isin(["none", "nan"])
     view_gdf = view_gdf.loc[~missing_mask].copy()
     if view_gdf.empty:
         return view_gdf
@@ -344,7 +605,7 @@ def prepare_map_df(
             if "year" in view_gdf.columns:
                 cols.append("year")
 
-            tmp = view_gdf[cols].copy()
+            tmp = view_gdf[cols]
             view_gdf = (
                 gpd.GeoDataFrame(tmp, geometry="geometry", crs=view_gdf.crs)
                 .dissolve(by=join_key, as_index=False)
@@ -354,67 +615,43 @@ def prepare_map_df(
                 view_gdf["year"] = int(year)
 
         except Exception:
-            grouped = []
-            for key_val, grp in view_gdf.groupby(join_key):
-                geom = grp.unary_union
-                row = grp.iloc[0].to_dict()
-                row["geometry"] = geom
-                row[join_key] = key_val
-                grouped.append(row)
-            view_gdf = gpd.GeoDataFrame(grouped, crs=gdf_all.crs)
-
-    # Filter CSV
+            # Whole-frame dissolve, first row's attributes per key. Parts of one
+            # riding tile without overlap, so shapely.coverage_union_all can be used.
+            view_gdf = view_gdf.dissolve(
+                by=join_key, aggfunc="first", as_index=False, method="coverage"
+            )
+
+    # Filter CSV; prev_participation normally comes from load_federal_csv
+    if "voter_participation_pct" in df_fed.columns and "prev_participation" not in df_fed.columns:
+        df_fed = _add_prev_participation(df_fed)
     df_year = df_fed[df_fed["year"] == int(year)].copy()
 
-    # Merge
-    merged = view_gdf.merge(df_year, on=join_key, how="left")
+    # Merge on one shared categorical dtype so the join compares integer codes
+    key_dtype = pd.CategoricalDtype(
+        pd.concat([view_gdf[join_key], df_year[join_key]]).dropna().unique()
+    )
+    view_gdf[join_key] = view_gdf[join_key].astype(key_dtype)
+    df_year[join_key] = df_year[join_key].astype(key_dtype)
+    merged = view_gdf.merge(df_year, on=join_key, how="left", sort=False)
     if merged is None or merged.empty:
         return merged
 
     # --------------------------------------------
     # Compute delta turnout (prev election)
     # --------------------------------------------
-    if "voter_participation_pct" in df_fed.columns:
-        if "riding_id" in df_fed.columns:
-            df_sorted = df_fed.sort_values(["riding_id", "year"])
-            df_sorted["prev_participation"] = df_sorted.groupby("riding_id")[
-                "voter_participation_pct"
-            ].shift(1)
-
-            prev = df_sorted[df_sorted["year"] == int(year)][
-                ["riding_id", "prev_participation"]
-            ]
-
-            if "riding_id" in merged.columns:
-                merged = merged.merge(prev, on="riding_id", how="left")
-                merged["delta_pct"] = (
-                    merged["voter_participation_pct"]
-                    - merged["prev_participation"]
-                )
-        else:
-            # fallback: by name
-            df_sorted = df_fed.sort_values(["riding_name", "year"])
-            df_sorted["prev_participation"] = df_sorted.groupby("riding_name")[
-                "voter_participation_pct"
-            ].shift(1)
-
-            prev = df_sorted[df_sorted["year"] == int(year)][
-                ["riding_name", "prev_participation"]
-            ]
-
-            if "riding_name" in merged.columns:
-                merged = merged.merge(prev, on="riding_name", how="left")
-                merged["delta_pct"] = (
-                    merged["voter_participation_pct"]
-                    - merged["prev_participation"]
-                )
-
-    # simplify
-    try:
-        merged["geometry"] = merged["geometry"].simplify(
-            tolerance=simplify_tol, preserve_topology=True
+    if "prev_participation" in merged.columns:
+        merged["delta_pct"] = (
+            merged["voter_participation_pct"]
+            - merged["prev_participation"]
         )
-    except Exception:
-        pass
+
+    # simplify (skipped when the caller simplifies afterwards)
+    if simplify_tol:
+        try:
+            merged["geometry"] = merged["geometry"].simplify(
+                tolerance=simplify_tol, preserve_topology=True
+            )
+        except Exception:
+            pass
 
     return merged
\ No newline at end of file
@@ -6,7 +6,11 @@ from pathlib import Path
 from typing import Iterable, Optional, Tuple, Dict, Any
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+from pyarrow import csv as pacsv
+
+from .utils import read_layer_4326
 
 
 # -------------------------------------------------------------------
@@ -37,7 +41,8 @@ def load_municipal_geometries(
       - Sub (int)
       - geometry (Polygon/MultiPolygon)
     """
-    gdf = gpd.read_file(path, layer=layer)
+    # Always WGS84 for web mapping; a reprojected copy is cached on disk
+    gdf = read_layer_4326(path, layer=layer)
 
     # Normalize dtypes
     for col in ["Year", "Ward", "Sub"]:
@@ -49,10 +54,6 @@ def load_municipal_geometries(
     gdf["Ward"] = gdf["Ward"].astype(int)
     gdf["Sub"] = gdf["Sub"].astype(int)
 
-    # Make sure CRS is WGS84 for web mapping
-    if gdf.crs is not None and gdf.crs.to_string().upper() != "EPSG:4326":
-        gdf = gdf.to_crs(epsg=4326)
-
     return gdf
 
 
@@ -68,7 +69,8 @@ def load_municipal_turnout(
       - Sub
       - PctVoted
     """
-    df = pd.read_csv(path)
+    # pyarrow's CSV reader is multi-threaded; dtypes match pd.read_csv
+    df = pacsv.read_csv(str(path)).to_pandas()
 
     # Normalize dtypes
     for col in ["Year", "Ward", "Sub"]:
@@ -121,26 +123,22 @@ def prepare_municipal_year_gdf(
       - geometry
     """
     # Filter by year
-    g_year = geom_gdf[geom_gdf["Year"] == int(year)].copy()
-    t_year = turnout_df[turnout_df["Year"] == int(year)].copy()
-
-    # Make sure keys are aligned
-    for col in ["Ward", "Sub"]:
-        g_year[col] = pd.to_numeric(g_year[col], errors="coerce")
-        t_year[col] = pd.to_numeric(t_year[col], errors="coerce")
+    g_year = geom_gdf[geom_gdf["Year"] == int(year)]
+    t_year = turnout_df[turnout_df["Year"] == int(year)]
 
-    g_year = g_year.dropna(subset=["Ward", "Sub"])
-    t_year = t_year.dropna(subset=["Ward", "Sub"])
-
-    g_year["Ward"] = g_year["Ward"].astype(int)
-    g_year["Sub"] = g_year["Sub"].astype(int)
-    t_year["Ward"] = t_year["Ward"].astype(int)
-    t_year["Sub"] = t_year["Sub"].astype(int)
+    # Keys are already int: the loaders coerce and drop missing Ward/Sub
+    for col in ("Ward", "Sub"):
+        if g_year[col].dtype.kind != "i" or t_year[col].dtype.kind != "i":
+            raise TypeError(
+                f"{col} must be an integer column; load the frames with "
+                "load_municipal_geometries() / load_municipal_turnout()."
+            )
 
     merged = g_year.merge(
         t_year[["Year", "Ward", "Sub", "PctVoted"]],
         on=["Year", "Ward", "Sub"],
         how="left",
+        sort=False,
         validate="1:1",
     )
 
@@ -151,7 +149,11 @@ def compute_turnout_summary(df_year: pd.DataFrame) -> Dict[str, Any]:
     """
     Compute basic turnout summary for a year.
     """
-    if "PctVoted" not in df_year.columns or df_year["PctVoted"].dropna().empty:
+    # One contiguous float64 buffer; NaNs dropped once
+    arr = np.asarray(df_year.get("PctVoted", np.array([])), dtype="float64")
+    arr = arr[~np.isnan(arr)]
+
+    if arr.size == 0:
         return {
             "n": len(df_year),
             "mean": None,
@@ -159,10 +161,9 @@ def compute_turnout_summary(df_year: pd.DataFrame) -> Dict[str, Any]:
             "max": None,
         }
 
-    series = df_year["PctVoted"].dropna()
     return {
-        "n": int(len(series)),
-        "mean": float(series.mean()),
-        "min": float(series.min()),
-        "max": float(series.max()),
+        "n": int(arr.size),
+        "mean": float(arr.mean()),
+        "min": float(arr.min()),
+        "max": float(arr.max()),
     }
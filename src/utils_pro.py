@@ -1,20 +1,31 @@
 # utils_pro.py
 
+import re
+
 import pandas as pd
 import geopandas as gpd
+import streamlit as st
 from pathlib import Path
 from .utils import normalize_names
 
+# em/en dash -> hyphen in one pass
+_DASH_TBL = str.maketrans({"—": "-", "–": "-"})
+
 # helper function to normalize district names
 def normalize_one(x: str) -> str:
     if not isinstance(x, str):
         return ""
+    return x.strip().lower().replace("  ", " ").translate(_DASH_TBL)
+
+
+def normalize_series(s: pd.Series) -> pd.Series:
+    """Vectorized normalize_one."""
     return (
-        x.strip()
-         .lower()
-         .replace("  ", " ")
-         .replace("—", "-")
-         .replace("–", "-")
+        s.fillna("")
+         .str.strip()
+         .str.lower()
+         .str.replace("  ", " ", regex=False)
+         .str.translate(_DASH_TBL)
     )
 
 # ------------------------
@@ -24,26 +35,36 @@ def normalize_one(x: str) -> str:
 CSV_PATH = Path("data/provincial/provincial_combined.csv")
 SHP_PATH = Path("data/provincial/ELECTORAL_DISTRICT.shp")  # adjust your path
 
-prov_all = pd.read_csv(CSV_PATH)
-gdf_prov = gpd.read_file(SHP_PATH)
-
 # ------------------------
 # Dash Cleaning Function
 # ------------------------
 
-def clean_dashes(x):
-    if isinstance(x, str):
-        return (
-            x.replace("â€”","—")
-             .replace("â€“","–")
-             .replace("--","—")
-             .strip()
-        )
-    return x
+def clean_dashes(s: pd.Series) -> pd.Series:
+    return (
+        s.str.replace("â€”", "—", regex=False)
+         .str.replace("â€“", "–", regex=False)
+         .str.replace("--", "—", regex=False)
+         .str.strip()
+    )
 
-# Clean CSV district names
-for col in ["ElectoralDistrictNameEnglish", "ElectoralDistrictNameFrench"]:
-    prov_all[col] = prov_all[col].apply(clean_dashes)
+
+# Loaded on first use (not at import) and cached across reruns
+@st.cache_data(ttl=3600)
+def _load_prov_csv() -> pd.DataFrame:
+    prov_all = pd.read_csv(CSV_PATH)
+
+    # Clean CSV district names
+    for col in ["ElectoralDistrictNameEnglish", "ElectoralDistrictNameFrench"]:
+        prov_all[col] = clean_dashes(prov_all[col])
+
+    return prov_all
+
+
+# Shared by reference (no pickle per call); get_provincial_map filters
+# and copies before adding columns, so the cached frame is never mutated
+@st.cache_resource(ttl=3600)
+def _load_prov_shp() -> gpd.GeoDataFrame:
+    return gpd.read_file(SHP_PATH)
 
 # ------------------------
 # Official Toronto Districts (normalized)
@@ -60,7 +81,14 @@ toronto_districts = [
     "willowdale", "york centre", "york south-weston"
 ]
 
-toronto_districts = [normalize_one(x) for x in toronto_districts]
+toronto_districts = frozenset(normalize_one(x) for x in toronto_districts)
+
+# Cheap superset filter on raw names: every Toronto district contains its
+# own first word, so only those rows need full normalization
+_TORONTO_PREFILTER = re.compile(
+    "|".join(sorted({re.escape(re.split(r"[ -]", x)[0]) for x in toronto_districts})),
+    re.IGNORECASE,
+)
 
 # ------------------------
 # Main Function
@@ -69,25 +97,29 @@ toronto_districts = [normalize_one(x) for x in toronto_districts]
 def get_provincial_map(year: int):
 
     # Filter election data
+    prov_all = _load_prov_csv()
     df = prov_all[prov_all["year"] == year].copy()
     df["ElectoralDistrictNumber"] = pd.to_numeric(df["ElectoralDistrictNumber"], errors="coerce")
 
     # Clean & normalize shapefile
-    gdf = gdf_prov.copy()
+    gdf = _load_prov_shp()
+    gdf = gdf[gdf["ENGLISH_NA"].str.contains(_TORONTO_PREFILTER, na=False)].copy()
     gdf["ED_ID"] = pd.to_numeric(gdf["ED_ID"], errors="coerce")
 
     # Normalize district names in shapefile
-    gdf["name_clean"] = gdf["ENGLISH_NA"].apply(normalize_one)
+    gdf["name_clean"] = normalize_series(gdf["ENGLISH_NA"])
 
     # Toronto-only filter (exact matching)
-    gdf = gdf[gdf["name_clean"].isin(toronto_districts)]
+    gdf = gdf[gdf["name_clean"].isin(toronto_districts)].copy()
+    gdf["ENGLISH_NA"] = gdf["ENGLISH_NA"].astype("category")
 
     # Merge the shapefile + CSV
     merged = gdf.merge(
         df,
         left_on="ED_ID",
         right_on="ElectoralDistrictNumber",
-        how="left"
+        how="left",
+        sort=False,
     )
 
     return merged